@@ -1,19 +1,192 @@
 """
 Auto-merge pre-commit and dependabot PRs across selected
-public repositories. This script checks specified
-repositories for a given GitHub user and automatically
-merges open pull requests from pre-commit.ci and
-dependabot if they pass all CI checks and have no merge
-conflicts.
+public repositories. This script searches the open pull
+requests of a given GitHub user (restricted to the configured
+repositories unless that list is empty) and merges those
+from pre-commit.ci and dependabot if they pass all CI checks
+and have no merge conflicts.
 """
 
-import json
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 
+import orjson
 from github import Github, GithubException
 
+# number of repositories merged concurrently; merges within a
+# repository run one at a time, so this bounds the merges in flight
+MAX_MERGE_WORKERS = 3
+
+# remaining requests below which to wait for the rate limit reset
+RATE_LIMIT_THRESHOLD = 50
+
+# number of repositories processed between rate limit checks
+RATE_LIMIT_CHECK_INTERVAL = 20
+
+# PR authors whose PRs are auto-merged; GraphQL reports bot
+# logins without the "[bot]" suffix
+BOT_AUTHORS = frozenset(
+    {
+        "pre-commit-ci[bot]",
+        "pre-commit-ci",
+        "dependabot[bot]",
+        "dependabot",
+        "dependabot-preview[bot]",
+        "dependabot-preview",
+    }
+)
+
+# search qualifiers for the bot authors above; searching each
+# one separately keeps every search well under GitHub's cap of
+# 1000 results
+BOT_SEARCH_AUTHORS = (
+    "app/pre-commit-ci",
+    "app/dependabot",
+    "app/dependabot-preview",
+)
+
+# check run conclusions that count as passing
+OK_CONCLUSIONS = frozenset({"SUCCESS", "NEUTRAL", "SKIPPED"})
+
+
+# searches open PRs across repositories and fetches each one
+# along with the rollup state of the checks on its latest
+# commit, so that finding candidates needs one request per
+# page of results rather than one listing per repository
+PR_SEARCH_QUERY = """
+query($query: String!, $cursor: String) {
+  search(type: ISSUE, query: $query, first: 100, after: $cursor) {
+    issueCount
+    pageInfo {
+      hasNextPage
+      endCursor
+    }
+    nodes {
+      ... on PullRequest {
+        number
+        title
+        body
+        author {
+          login
+        }
+        repository {
+          nameWithOwner
+        }
+        commits(last: 1) {
+          nodes {
+            commit {
+              statusCheckRollup {
+                state
+                contexts(first: 100) {
+                  nodes {
+                    __typename
+                    ... on CheckRun {
+                      name
+                      status
+                      conclusion
+                    }
+                    ... on StatusContext {
+                      context
+                      state
+                    }
+                  }
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+def wait_for_rate_limit(g, resource):
+    """
+    Sleep until the rate limit resets if few requests remain.
+
+    Parameters
+    ----------
+    g : Github
+        Authenticated GitHub client.
+    resource : str
+        Rate limit bucket to check, "core" for REST calls or
+        "graphql" for GraphQL queries.
+    """
+    # the rate limit endpoint does not count against the limit;
+    # PyGithub 2.7+ nests the buckets under "resources"
+    try:
+        rate_limit = g.get_rate_limit()
+    except GithubException as e:
+        # a failed poll should not abort the run
+        print(f"Warning: could not check the rate limit: {str(e)}.")
+        return
+    rate_limit = getattr(rate_limit, "resources", rate_limit)
+    limit = getattr(rate_limit, resource)
+    if limit.remaining < RATE_LIMIT_THRESHOLD:
+        sleep_for = max(0, limit.reset.timestamp() - time.time())
+        print(f"Rate limit nearly exhausted; waiting {sleep_for:.0f}s.")
+        time.sleep(sleep_for)
+
+
+def search_open_prs(g, owners):
+    """
+    Search the open bot PRs in the non-archived repositories
+    of the given owners, with their CI status.
+
+    Parameters
+    ----------
+    g : Github
+        Authenticated GitHub client.
+    owners : list[str]
+        Users or organizations whose repositories to search.
+
+    Returns
+    -------
+    list[dict]
+        Pull request nodes from the GraphQL response.
+    """
+    prs = []
+    for author in BOT_SEARCH_AUTHORS:
+        query = " ".join(
+            ["is:pr", "is:open", "archived:false", f"author:{author}"]
+            + [f"user:{owner}" for owner in owners]
+        )
+        author_prs = []
+        cursor = None
+        wait_for_rate_limit(g, "graphql")
+        while True:
+            _, data = g._Github__requester.requestJsonAndCheck(
+                "POST",
+                "/graphql",
+                input={
+                    "query": PR_SEARCH_QUERY,
+                    "variables": {"query": query, "cursor": cursor},
+                },
+            )
+            if data.get("errors"):
+                raise GithubException(200, data, None)
+            search = data["data"]["search"]
+            author_prs.extend(search["nodes"])
+            if not search["pageInfo"]["hasNextPage"]:
+                break
+            cursor = search["pageInfo"]["endCursor"]
+
+        # search stops returning results past its cap
+        if search["issueCount"] > len(author_prs):
+            print(
+                f"Warning: search for {author} found "
+                f"{search['issueCount']} PRs but returned only "
+                f"{len(author_prs)}."
+            )
+        prs.extend(author_prs)
+
+    return prs
+
 
 def should_auto_merge(pr):
     """
@@ -21,8 +194,8 @@ def should_auto_merge(pr):
 
     Parameters
     ----------
-    pr : PullRequest
-        GitHub pull request object.
+    pr : dict
+        Pull request node from search_open_prs.
 
     Returns
     -------
@@ -33,70 +206,130 @@ def should_auto_merge(pr):
 
     """
     # check if PR is from pre-commit.ci or dependabot
-    author = pr.user.login.lower()
-    if author not in [
-        "pre-commit-ci[bot]",
-        "dependabot[bot]",
-        "dependabot",
-        "dependabot-preview[bot]",
-    ]:
+    author = (pr.get("author") or {}).get("login", "").lower()
+    if author not in BOT_AUTHORS:
         return False, f"Author {author} is not a bot we auto-merge."
 
-    # check if PR is mergeable (no conflicts)
-    if not pr.mergeable:
-        return False, "PR has merge conflicts."
-
-    # check if all status checks and check runs pass
-    commit = pr.get_commits().reversed[0]
-
-    # check status API (older CI systems)
-    combined_status = commit.get_combined_status()
-    has_statuses = combined_status.total_count > 0
-
-    # check runs API (GitHub Actions)
-    check_runs = commit.get_check_runs()
-    has_check_runs = check_runs.totalCount > 0
+    # check the combined status of the latest commit, which
+    # covers both the status API and check runs
+    commits = pr["commits"]["nodes"]
+    rollup = commits[0]["commit"]["statusCheckRollup"] if commits else None
 
     # if no checks at all, allow merge
-    if not has_statuses and not has_check_runs:
+    if rollup is None:
         return True, "No CI checks configured, proceeding."
 
-    # check status API results
-    if has_statuses and combined_status.state != "success":
-        return False, f"Status checks: {combined_status.state}."
+    if rollup["state"] == "SUCCESS":
+        return True, "All checks passed."
 
-    # check runs API results
-    if has_check_runs:
-        for check_run in check_runs:
-            # only consider required checks
-            if check_run.status != "completed":
+    # the rollup already decided; only look at individual checks
+    # to report the first one that is not passing
+    for context in rollup["contexts"]["nodes"]:
+        if context["__typename"] == "CheckRun":
+            name = context["name"]
+            if context["status"] != "COMPLETED":
                 return (
                     False,
                     (
-                        f"Check run '{check_run.name}' not completed: "
-                        f"{check_run.status}."
+                        f"Check run '{name}' not completed: "
+                        f"{context['status'].lower()}."
                     ),
                 )
-            if check_run.conclusion not in ["success", "neutral", "skipped"]:
+            if context["conclusion"] not in OK_CONCLUSIONS:
                 return (
                     False,
                     (
-                        f"Check run '{check_run.name}' failed: "
-                        f"{check_run.conclusion}."
+                        f"Check run '{name}' failed: "
+                        f"{context['conclusion'].lower()}."
                     ),
                 )
+        elif context["state"] != "SUCCESS":
+            return (
+                False,
+                (
+                    f"Status check '{context['context']}': "
+                    f"{context['state'].lower()}."
+                ),
+            )
+
+    return False, f"Status checks: {rollup['state'].lower()}."
+
+
+def merge_pr(repo, full_repo_name, pr, log):
+    """
+    Squash-merge a single PR.
 
-    return True, "All checks passed."
+    Parameters
+    ----------
+    repo : Repository
+        GitHub repository object, lazily loaded.
+    full_repo_name : str
+        Full repository name, as "owner/repo".
+    pr : dict
+        Pull request node from search_open_prs.
+    log : list[str]
+        Log lines for the repository, appended to in place.
+
+    Returns
+    -------
+    dict
+        Merge result containing repo, PR number, status, and message.
+    """
+    number, title = pr["number"], pr["title"]
+    try:
+        # the message is only built for PRs that are being merged
+        commit_message = (
+            f"Auto-merged by auto-merge workflow.\n\n{pr['body'] or ''}"
+        )
+        repo.get_pull(number).merge(
+            merge_method="squash",
+            commit_title=f"{title}",
+            commit_message=commit_message,
+        )
+        log.append(f"Merged {full_repo_name} PR #{number}: {title}.")
+        return {
+            "repo": full_repo_name,
+            "pr": number,
+            "status": "merged",
+            "message": f"Successfully merged PR #{number}: {title}.",
+        }
+    except GithubException as e:
+        # conflicts are not checked up front (GitHub may still be
+        # computing mergeability); a conflicting PR is refused with a
+        # 405 "Pull Request is not mergeable", while a modified base
+        # branch or branch protection get a 405 with their own message
+        if e.status == 405:
+            data = e.data if isinstance(e.data, dict) else {}
+            detail = (data.get("message") or str(e)).rstrip(".")
+            if "not mergeable" in detail.lower():
+                reason = "merge conflict"
+            else:
+                reason = detail
+        else:
+            reason = str(e)
+        log.append(f"Failed to merge {full_repo_name} PR #{number}: {reason}.")
+        return {
+            "repo": full_repo_name,
+            "pr": number,
+            "status": "failed",
+            "message": f"Failed to merge: {reason}.",
+        }
 
 
-def auto_merge_repo_prs(repo):
+def auto_merge_repo_prs(repo, full_repo_name, prs, log):
     """
     Auto-merge eligible PRs in a repository.
 
     Parameters
     ----------
     repo : Repository
-        GitHub repository object.
+        GitHub repository object, lazily loaded.
+    full_repo_name : str
+        Full repository name, as "owner/repo".
+    prs : list[dict]
+        Pull request nodes from search_open_prs.
+    log : list[str]
+        Log lines for the repository, appended to in place.
 
     Returns
     -------
@@ -104,58 +337,42 @@ def auto_merge_repo_prs(repo):
         List of merge results containing repo, PR number, status, and message.
     """
     results = []
-    try:
-        prs = repo.get_pulls(state="open")
-
-        for pr in prs:
-            should_merge, reason = should_auto_merge(pr)
-
-            if should_merge:
-                try:
-                    pr.merge(
-                        merge_method="squash",
-                        commit_title=f"{pr.title}",
-                        commit_message=(
-                            "Auto-merged by auto-merge workflow."
-                            f"\n\n{pr.body or ''}"
-                        ),
-                    )
-                    results.append(
-                        {
-                            "repo": repo.full_name,
-                            "pr": pr.number,
-                            "status": "merged",
-                            "message": (
-                                "Successfully merged PR "
-                                f"#{pr.number}: {pr.title}."
-                            ),
-                        }
-                    )
-                    print(
-                        f"Merged {repo.full_name} PR #{pr.number}: {pr.title}."
-                    )
-                except GithubException as e:
-                    results.append(
-                        {
-                            "repo": repo.full_name,
-                            "pr": pr.number,
-                            "status": "failed",
-                            "message": f"Failed to merge: {str(e)}.",
-                        }
-                    )
-                    print(
-                        f"Failed to merge {repo.full_name} PR "
-                        f"#{pr.number}: {str(e)}."
-                    )
-            else:
-                print(f"Skipped {repo.full_name} PR #{pr.number}: {reason}")
+    for pr in prs:
+        should_merge, reason = should_auto_merge(pr)
 
-    except GithubException as e:
-        print(f"Error accessing {repo.full_name}: {str(e)}.")
+        # merges into the same base branch run one at a time, since
+        # concurrent ones make each other fail with a modified base
+        if should_merge:
+            results.append(merge_pr(repo, full_repo_name, pr, log))
+        else:
+            log.append(
+                f"Skipped {full_repo_name} PR #{pr['number']}: {reason}"
+            )
 
     return results
 
 
+@lru_cache(maxsize=1)
+def _parse_config(config_path, mtime_ns):
+    """
+    Parse a config file, caching the result.
+
+    Parameters
+    ----------
+    config_path : str
+        Path to the configuration file.
+    mtime_ns : int
+        Modification time of the file, so that an edited config
+        is parsed again rather than served from the cache.
+
+    Returns
+    -------
+    object
+        Parsed JSON content of the file.
+    """
+    return orjson.loads(Path(config_path).read_bytes())
+
+
 def load_repositories_config(config_path="config/repositories.json"):
     """
     Load the list of repositories to check from a config file.
@@ -167,26 +384,87 @@ def load_repositories_config(config_path="config/repositories.json"):
 
     Returns
     -------
-    list[str]
-        List of repository names.
+    list[str] | None
+        List of repository names, or None if the config file is
+        missing or invalid.
     """
     config_file = Path(config_path)
 
     if not config_file.exists():
-        print(f"Warning: Config file {config_path} not found.")
+        print(f"Error: Config file {config_path} not found.")
         print(
             "Please create a repositories.json file in the config folder "
             "with the list of repositories to target."
         )
-        return []
+        return None
 
     try:
-        with open(config_file) as f:
-            config = json.load(f)
-            return config.get("repositories", [])
-    except json.JSONDecodeError as e:
+        config = _parse_config(
+            str(config_file), config_file.stat().st_mtime_ns
+        )
+    except orjson.JSONDecodeError as e:
         print(f"Error parsing {config_path}: {e}.")
-        return []
+        return None
+
+    if not isinstance(config, dict) or not isinstance(
+        config.get("repositories"), list
+    ):
+        print(f"Error: {config_path} has no list of repositories.")
+        return None
+
+    return list(config["repositories"])
+
+
+def resolve_repo_name(repo_name, username):
+    """
+    Resolve a configured repository name to its full name.
+
+    Parameters
+    ----------
+    repo_name : str
+        Repository name, as "owner/repo" or "repo".
+    username : str
+        GitHub username used when no owner is given.
+
+    Returns
+    -------
+    str
+        Full repository name.
+    """
+    # handle both "owner/repo" and "repo" formats
+    if "/" not in repo_name:
+        return f"{username}/{repo_name}"
+    return repo_name
+
+
+def process_repo(g, full_repo_name, prs):
+    """
+    Auto-merge the eligible PRs found in a repository.
+
+    Parameters
+    ----------
+    g : Github
+        Authenticated GitHub client.
+    full_repo_name : str
+        Full repository name, as "owner/repo".
+    prs : list[dict]
+        Pull request nodes from search_open_prs.
+
+    Returns
+    -------
+    results : list[dict]
+        List of merge results containing repo, PR number, status, and message.
+    log : list[str]
+        Log lines for the repository, printed by the caller so
+        that they are not interleaved with other repositories'.
+    """
+    # the client is lazy, so this costs no request; the
+    # repository is only needed for the merge calls
+    repo = g.get_repo(full_repo_name)
+
+    log = [f"\nChecking {full_repo_name}..."]
+    results = auto_merge_repo_prs(repo, full_repo_name, prs, log)
+    return results, log
 
 
 def main():
@@ -207,40 +485,66 @@ def main():
 
     repo_names = load_repositories_config()
 
-    if not repo_names:
-        print("No repositories configured. Exiting.")
+    # a missing or broken config must not widen the merge scope
+    if repo_names is None:
+        print("No valid repositories config. Exiting.")
         return 1
 
-    g = Github(token)
-
-    print(f"Checking {len(repo_names)} repositories...")
-    print("=" * 60)
+    # the configured repositories are an allow-list applied to the
+    # search results; only an explicitly empty list means all of
+    # the user's repositories
+    repo_names = [
+        resolve_repo_name(repo_name, username) for repo_name in repo_names
+    ]
+    allowed = {repo_name.lower() for repo_name in repo_names}
+    owners = sorted({repo_name.split("/")[0] for repo_name in repo_names})
+
+    if not owners:
+        if not username:
+            print("Error: GITHUB_USERNAME not set.")
+            return 1
+        print(f"Empty repositories list; checking all of {username}'s.")
+        owners = [username]
+
+    # lazy, so that repository and PR objects are built without
+    # fetching them and every call goes through one requester
+    g = Github(token, per_page=100, lazy=True)
 
-    all_results = []
-
-    for repo_name in repo_names:
-        # handle both "owner/repo" and "repo" formats
-        if "/" not in repo_name:
-            full_repo_name = f"{username}/{repo_name}"
-        else:
-            full_repo_name = repo_name
-
-        try:
-            repo = g.get_repo(full_repo_name)
+    try:
+        prs = search_open_prs(g, owners)
+    except GithubException as e:
+        print(f"Error searching pull requests: {str(e)}.")
+        return 1
 
-            if repo.archived:
-                print(f"\nSkipping archived repository: {full_repo_name}.")
-                continue
+    # group the candidate PRs by repository
+    repo_prs = {}
+    for pr in prs:
+        full_repo_name = pr["repository"]["nameWithOwner"]
+        if allowed and full_repo_name.lower() not in allowed:
+            continue
+        repo_prs.setdefault(full_repo_name, []).append(pr)
 
-            print(f"\nChecking {full_repo_name}...")
-            results = auto_merge_repo_prs(repo)
-            all_results.extend(results)
+    print(f"Checking {len(repo_prs)} repositories with open PRs...")
+    print("=" * 60)
 
-        except GithubException as e:
-            print(f"Error accessing {full_repo_name}: {str(e)}.")
+    all_results = []
 
-        # rate limit protection
-        time.sleep(1)
+    # the work is dominated by merge round trips, so a small pool
+    # overlaps those of different repositories without hammering
+    # the write endpoints; the merge quota is checked once per
+    # batch of repositories
+    names = list(repo_prs)
+    with ThreadPoolExecutor(max_workers=MAX_MERGE_WORKERS) as executor:
+        for start in range(0, len(names), RATE_LIMIT_CHECK_INTERVAL):
+            wait_for_rate_limit(g, "core")
+            futures = {
+                executor.submit(process_repo, g, name, repo_prs[name]): name
+                for name in names[start : start + RATE_LIMIT_CHECK_INTERVAL]
+            }
+            for future in as_completed(futures):
+                results, log = future.result()
+                print("\n".join(log))
+                all_results.extend(results)
 
     print("\n" + "=" * 60)
     print("Summary:")